@@ -1,117 +1,197 @@
-from __future__ import print_function
+from botocore.config import Config
 from botocore.exceptions import ClientError
-import ast
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 import logging
+import mimetypes
 import os
-import sys
-import traceback
+import shlex
+import threading
 import time
-# xxxpylint: disable=print-statement
 
 LOG_FILE_NAME = 'output.log'
 
 REGION = 'us-east-2'
 
+# Configure logging once per process, appending so earlier runs' logs are kept.
+# Leave it alone if the embedding application already set up logging.
+if not logging.getLogger().hasHandlers():
+    logging.basicConfig(filename=LOG_FILE_NAME,
+                        level=logging.DEBUG, filemode='a',
+                        format='%(asctime)s %(message)s',
+                        datefmt='%m/%d/%Y %I:%M:%S %p')
+
+# Route object transfers through the S3 Transfer Acceleration edge endpoints.
+# Opt-in (S3_ACCELERATE=1) since it only works on buckets with acceleration enabled.
+ACCELERATE = os.environ.get('S3_ACCELERATE') == '1'
+
+# Adaptive mode backs off with jitter and rate-limits the client on 503 SlowDown.
+RETRIES = {'mode': 'adaptive', 'max_attempts': 10}
+
+MB = 1024 * 1024
+
+# Shared transfer settings, pinned explicitly so the pool sizing below can rely
+# on them: anything above 8MB is split into 8MB parts, up to 10 moving at once.
+# These match boto3's TransferConfig() defaults.
+TRANSFER_CFG = TransferConfig(multipart_threshold=8 * MB,
+                              multipart_chunksize=8 * MB,
+                              max_concurrency=10,
+                              use_threads=True)
+
+# Number of buckets listed concurrently when searching across all buckets.
+MAX_LIST_WORKERS = 16
+
+# Most keys a single delete_objects request accepts.
+MAX_DELETE_BATCH = 1000
+
+# Seconds a head_bucket answer is trusted before asking S3 again.
+BUCKET_CACHE_TTL = 30
+
+# Error codes S3 uses to say a bucket or key is missing (HEAD responses carry only '404').
+NOT_FOUND_CODES = ('404', 'NoSuchBucket', 'NoSuchKey', 'NotFound')
+
+# Transfers sized for in the connection pool. The REPL runs one at a time; the
+# rest is headroom for scripts that share the client across threads.
+MAX_CONCURRENT_TRANSFERS = 4
+
+# Enough pooled connections for every part of every concurrent transfer plus
+# every find worker, so none has to open (and TLS-handshake) overflow connections.
+MAX_POOL_CONNECTIONS = TRANSFER_CFG.max_concurrency * MAX_CONCURRENT_TRANSFERS + MAX_LIST_WORKERS
+
+# One session and client shared by every S3Handler so the service model is
+# loaded once and pooled connections stay warm between handlers. Built on first
+# use, so commands like 'help' and 'exit' never pay for loading it.
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client():
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                session = boto3.session.Session()
+                _CLIENT = session.client('s3', config=Config(
+                    region_name=REGION,
+                    retries=RETRIES,
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    s3={'use_accelerate_endpoint': ACCELERATE}))
+    return _CLIENT
+
+
 class S3Handler:
     """S3 handler."""
 
-    def __init__(self):
-        self.client = boto3.client('s3')
+    _ERRORS = {
+        'incorrect_parameter_number': 'Incorrect number of parameters provided',
+        'not_implemented': 'Functionality not implemented yet!',
+        'bucket_name_exists': 'Directory already exists.',
+        'bucket_name_empty': 'Directory name cannot be empty.',
+        'bucket_not_empty': 'Directory is not empty. Delete objects before proceeding.',
+        'missing_source_file': 'Source file cannot be found.',
+        'non_existent_bucket': 'Directory does not exist.',
+        'non_existent_object': 'Destination object does not exist.',
+        'not_authorized_bucket': 'You are not authorized to access this directory',
+        'unknown_option': 'Unrecognized option provided',
+        'unknown_error': 'Something was not correct with the request. Try again.',
+    }
 
-        logging.basicConfig(filename=LOG_FILE_NAME,
-                            level=logging.DEBUG, filemode='w',
-                            format='%(asctime)s %(message)s',
-                            datefmt='%m/%d/%Y %I:%M:%S %p')
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=MAX_LIST_WORKERS)
+        # bucket_name -> (exists, expires_at)
+        self._bucket_cache = {}
+        # command -> (handler, min_args, max_args)
+        self._commands = {
+            'createdir': (self.createdir, 1, 1),
+            'upload': (self.upload, 2, 3),
+            'download': (self.download, 2, 3),
+            'delete': (self.delete, 2, 2),
+            'deletedir': (self.deletedir, 1, 2),
+            'find': (self.find, 1, 2),
+            'listdir': (self.listdir, 0, 1),
+            'copy': (self.copy, 3, 4),
+        }
         self.logger = logging.getLogger("S3Handler")
 
+    @property
+    def client(self):
+        return _get_client()
+
     def help(self):
         print("Supported Commands:")
         print("1. createdir <bucket_name>")
         print("2. upload <source_file_name> <bucket_name> [<dest_object_name>]")
         print("3. download <dest_object_name> <bucket_name> [<source_file_name>]")
         print("4. delete <dest_object_name> <bucket_name>")
-        print("5. deletedir <bucket_name>")
+        print("5. deletedir <bucket_name> [-r] -- -r deletes the objects in it first --")
         print("6. find <file_extension> [<bucket_name>] -- e.g.: 1. find txt  2. find txt bucket1 --")
         print("7. listdir [<bucket_name>]")
+        print("8. copy <src_object_name> <src_bucket_name> <dest_bucket_name> [<dest_object_name>]")
     
     def _error_messages(self, issue):
-        error_message_dict = {}
-        error_message_dict['incorrect_parameter_number'] = 'Incorrect number of parameters provided'
-        error_message_dict['not_implemented'] = 'Functionality not implemented yet!'
-        error_message_dict['bucket_name_exists'] = 'Directory already exists.'
-        error_message_dict['bucket_name_empty'] = 'Directory name cannot be empty.'
-        error_message_dict['bucket_not_empty'] = 'Directory is not empty. Delete objects before proceeding.'
-        error_message_dict['missing_source_file'] = 'Source file cannot be found.'
-        error_message_dict['non_existent_bucket'] = 'Directory does not exist.'
-        error_message_dict['non_existent_object'] = 'Destination object does not exist.'
-        error_message_dict['not_authorized_bucket'] = 'You are not authorized to access this directory'
-        error_message_dict['unknown_error'] = 'Something was not correct with the request. Try again.'
-
-        if issue:
-            return error_message_dict[issue]
-        else:
-            return error_message_dict['unknown_error']
-
-    def _get_file_extension(self, file_name):
-        if os.path.exists(file_name):
-            return os.path.splitext(file_name)
+        return self._ERRORS.get(issue, self._ERRORS['unknown_error'])
 
-    def _get(self, bucket_name):
-        response = ''
+    def _exists(self, head, **kwargs):
+        # True if the head_* call succeeds, False on a not-found error; anything
+        # else (e.g. 403) is raised to the caller.
         try:
-            response = self.client.head_bucket(Bucket=bucket_name)
-        except Exception as e:
-            # print(e)
-            # traceback.print_exc(file=sys.stdout)
-            
-            response_code = e.response['Error']['Code']
-            if response_code == '404':
+            head(**kwargs)
+        except ClientError as e:
+            if self._error_code(e) in NOT_FOUND_CODES:
                 return False
-            elif response_code == '200':
-                return True
-            else:
-                raise e
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return True
-        else:
-            return False
+            raise
+        return True
+
+    def _get(self, bucket_name):
+        return self._exists(self.client.head_bucket, Bucket=bucket_name)
 
     def _get_object(self, bucket_name, object_name):
-        response = ''
-        try:
-            response = self.client.head_object(Bucket=bucket_name, Key=object_name)
-        except Exception as e:
-            response_code = e.response['Error']['Code']
-            if response_code == '404':
-                return False
-            elif response_code == '200':
-                return True
-            else:
-                raise e
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return True
-        else:
-            return False
+        return self._exists(self.client.head_object, Bucket=bucket_name, Key=object_name)
+
+    def _bucket_exists(self, bucket_name):
+        # Same answer as _get(), but remembered for BUCKET_CACHE_TTL seconds so
+        # back-to-back commands on one bucket don't each pay a head_bucket round-trip.
+        now = time.time()
+        entry = self._bucket_cache.get(bucket_name)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        exists = self._get(bucket_name)
+        self._bucket_cache[bucket_name] = (exists, now + BUCKET_CACHE_TTL)
+        return exists
+
+    def _set_bucket_exists(self, bucket_name, exists):
+        self._bucket_cache[bucket_name] = (exists, time.time() + BUCKET_CACHE_TTL)
+
+    def _error_code(self, e):
+        return e.response['Error']['Code']
 
     def createdir(self, bucket_name):
         if not bucket_name:
             return self._error_messages('bucket_name_empty')
 
+        # An existing bucket is reported by create_bucket itself, no need to head_bucket first
         try:
-            if self._get(bucket_name):
-                return self._error_messages('bucket_name_exists')
             self.client.create_bucket(Bucket=bucket_name,
                                       CreateBucketConfiguration={'LocationConstraint': REGION})
-        except Exception as e:
+        except ClientError as e:
+            code = self._error_code(e)
+            if code in ('BucketAlreadyOwnedByYou', 'BucketAlreadyExists'):
+                # BucketAlreadyExists means another account owns it, so it isn't usable here
+                if code == 'BucketAlreadyOwnedByYou':
+                    self._set_bucket_exists(bucket_name, True)
+                return self._error_messages('bucket_name_exists')
             print(e)
             raise e
+        self._set_bucket_exists(bucket_name, True)
 
         # Success response
-        operation_successful = ('Directory %s created.' % bucket_name)
+        operation_successful = f'Directory {bucket_name} created.'
         return operation_successful
 
-    def listdir(self, bucket_name):
+    def listdir(self, bucket_name=''):
         result = []
 
         # If bucket_name is empty then display the names of all the buckets
@@ -124,47 +204,59 @@ class S3Handler:
 
         # If bucket_name is provided, check that bucket exits.
         else:
-            if not self._get(bucket_name):
+            if not self._bucket_exists(bucket_name):
                 return self._error_messages('non_existent_bucket')
             # If bucket_name is provided then display the names of all objects in the bucket
-            object_list = self.client.list_objects_v2(
-                Bucket=bucket_name
-            )
-            
-            print('Available objects in directory %s:' % bucket_name)
-            objects = object_list['Contents']
-            for obj in objects:
-                result.append(obj['Key'])
+            # Page through the listing so buckets with more than 1000 objects are fully shown
+            paginator = self.client.get_paginator('list_objects_v2')
+            try:
+                pages = paginator.paginate(Bucket=bucket_name,
+                                           PaginationConfig={'PageSize': 1000})
+                for page in pages:
+                    for obj in page.get('Contents', []):
+                        result.append(obj['Key'])
+            except ClientError as e:
+                # The cached answer can be stale if the bucket was deleted elsewhere
+                if self._error_code(e) == 'NoSuchBucket':
+                    self._set_bucket_exists(bucket_name, False)
+                    return self._error_messages('non_existent_bucket')
+                raise
+
+            print(f'Available objects in directory {bucket_name}:')
 
         return ', '.join(result)
 
     def upload(self, source_file_name, bucket_name, dest_object_name=''):
         # 1. Parameter Validation
         #    - source_file_name exits in current directory
-        #    - bucket_name exists
+        #    - bucket_name exists (reported by the upload call itself, saving a round-trip)
         if not os.path.exists(source_file_name):
             return self._error_messages('missing_source_file')
 
-        if not self._get(bucket_name):
-            return self._error_messages('non_existent_bucket')
-
         # 2. If dest_object_name is not specified then use the source_file_name as dest_object_name
         if dest_object_name == '':
             dest_object_name = source_file_name
 
         # 3. SDK call
-        #    - When uploading the source_file_name and add it to object's meta-data
-        #    - Use self._get_file_extension() method to get the extension of the file.
-        file_extension = self._get_file_extension(source_file_name)
-        action = self.client.upload_file(source_file_name, bucket_name, dest_object_name, ExtraArgs={'ContentType': file_extension[1]})
-
+        #    - Store the MIME type guessed from the file name as the object's ContentType
+        content_type = mimetypes.guess_type(source_file_name)[0] or 'application/octet-stream'
+        #    - upload_file (unlike upload_fileobj) reads each part from its own file handle
+        #      on the transfer threads, so parts are read in parallel and not buffered in memory
         try:
-            action
-        except Exception as e:
-            return ("Failed to upload %s to %s: %s" % (source_file_name, '/'.join([bucket_name, dest_object_name]), e))
+            self.client.upload_file(source_file_name, bucket_name, dest_object_name,
+                                    ExtraArgs={'ContentType': content_type},
+                                    Config=TRANSFER_CFG)
+        except S3UploadFailedError as e:
+            # upload_file wraps the S3 error; the original ClientError is the exception context
+            cause = e.__context__
+            if isinstance(cause, ClientError) and self._error_code(cause) == 'NoSuchBucket':
+                self._set_bucket_exists(bucket_name, False)
+                return self._error_messages('non_existent_bucket')
+            return f"Failed to upload {source_file_name} to {bucket_name}/{dest_object_name}: {e}"
+        self._set_bucket_exists(bucket_name, True)
 
         # Success response
-        operation_successful = ('File %s uploaded to bucket %s.' % (source_file_name, bucket_name))
+        operation_successful = f'File {source_file_name} uploaded to bucket {bucket_name}.'
 
         return operation_successful
 
@@ -174,204 +266,218 @@ class S3Handler:
         # If the current directory already contains a file with source_file_name then move it as a backup
         # with following format: <source_file_name.bak.current_time_stamp_in_millis>
         
-        # Parameter Validation
-        if not self._get(bucket_name):                          #check for directory
-            return self._error_messages('non_existent_bucket')
-        if not self._get_object(bucket_name, dest_object_name):      #check for object
-            return self._error_messages('non_existent_object')
-
         if source_file_name == '':
             source_file_name = dest_object_name 
 
         #create backup file
-        if os.path.exists(source_file_name):
-            time_in_millis = int(round(time.time() * 1000))
-            source_file_name = source_file_name + '.bak.' + str(time_in_millis)
-        
+        backup_file_name = f"{source_file_name}.bak.{time.time_ns() // 1000000}"
+        try:
+            os.replace(source_file_name, backup_file_name)
+        except FileNotFoundError:
+            backup_file_name = None
+
         # SDK Call
-        action = self.client.download_file(bucket_name, dest_object_name, source_file_name)
+        # A missing bucket or object comes back as an error from the download itself.
+        downloaded = False
+        try:
+            self.client.download_file(bucket_name, dest_object_name, source_file_name,
+                                      Config=TRANSFER_CFG)
+            downloaded = True
+        except ClientError as e:
+            code = self._error_code(e)
+            if code == 'NoSuchBucket':
+                self._set_bucket_exists(bucket_name, False)
+                return self._error_messages('non_existent_bucket')
+            if code in NOT_FOUND_CODES:
+                # download_file starts with a HEAD, whose 404 doesn't say which one is missing
+                if not self._bucket_exists(bucket_name):
+                    return self._error_messages('non_existent_bucket')
+                return self._error_messages('non_existent_object')
+            return f"Failed to download {dest_object_name} to {bucket_name}/{source_file_name}: {e}"
+        finally:
+            # Whatever stopped the download (S3 error, network error, Ctrl-C),
+            # nothing replaced the existing file, so put it back
+            if not downloaded and backup_file_name is not None:
+                os.replace(backup_file_name, source_file_name)
+
+        # Success response
+        operation_successful = f'Object {dest_object_name} downloaded from bucket {bucket_name}.'
+
+        return operation_successful
+
+
+    def copy(self, src_object_name, src_bucket_name, dest_bucket_name, dest_object_name=''):
+        # If dest_object_name is not specified then keep the source object's name
+        if dest_object_name == '':
+            dest_object_name = src_object_name
 
+        # SDK Call
+        # client.copy is a managed server-side copy (multipart UploadPartCopy for
+        # large objects), so the data never passes through this machine.
         try:
-            action
-        except Exception as e:
-            return ("Failed to download %s to %s: %s" % (dest_object_name, '/'.join([bucket_name, source_file_name]), e))
+            self.client.copy({'Bucket': src_bucket_name, 'Key': src_object_name},
+                             dest_bucket_name, dest_object_name,
+                             Config=TRANSFER_CFG)
+        except ClientError as e:
+            code = self._error_code(e)
+            if code == 'NoSuchBucket':
+                # Only the copy request itself names the bucket; the source HEAD just says 404
+                self._set_bucket_exists(dest_bucket_name, False)
+                return self._error_messages('non_existent_bucket')
+            if code in NOT_FOUND_CODES:
+                if not self._bucket_exists(src_bucket_name):
+                    return self._error_messages('non_existent_bucket')
+                return self._error_messages('non_existent_object')
+            return (f"Failed to copy {src_bucket_name}/{src_object_name} to "
+                    f"{dest_bucket_name}/{dest_object_name}: {e}")
 
         # Success response
-        operation_successful = ('Object %s downloaded from bucket %s.' % (dest_object_name, bucket_name))
+        operation_successful = (f'Object {src_object_name} copied from bucket {src_bucket_name} '
+                                f'to bucket {dest_bucket_name}.')
 
         return operation_successful
 
 
     def delete(self, dest_object_name, bucket_name):
         # Parameter Validation
-        if not self._get(bucket_name):                              #check for directory
-            return self._error_messages('non_existent_bucket')
+        # delete_object succeeds for missing keys, so the object check has to stay.
+        # head_object also answers 404 for a missing bucket; only look at the
+        # (cached) bucket when the object lookup fails.
         if not self._get_object(bucket_name, dest_object_name):     #check for object
+            if not self._bucket_exists(bucket_name):                #check for directory
+                return self._error_messages('non_existent_bucket')
             return self._error_messages('non_existent_object')
 
-        action = self.client.delete_object(
-            Bucket=bucket_name,
-            Key=dest_object_name
-        )
-
         try:
-            action
-        except Exception as e:
-            return ("Failed to delete %s from directory %s: %s" % (dest_object_name, bucket_name, e))
+            self.client.delete_object(
+                Bucket=bucket_name,
+                Key=dest_object_name
+            )
+        except ClientError as e:
+            return f"Failed to delete {dest_object_name} from directory {bucket_name}: {e}"
         
         # Success response
-        operation_successful = ('Object %s deleted from bucket %s.' % (dest_object_name, bucket_name))
+        operation_successful = f'Object {dest_object_name} deleted from bucket {bucket_name}.'
         
         return operation_successful
 
 
-    def deletedir(self, bucket_name):
-        # Parameter Validation
-        if not self._get(bucket_name):          #check for directory
-            return self._error_messages('non_existent_bucket')
+    def _delete_many(self, bucket_name, keys):
+        # One delete_objects request per MAX_DELETE_BATCH keys instead of one request per key.
+        # Returns the per-key errors; in quiet mode those are all the response contains.
+        errors = []
+        for start in range(0, len(keys), MAX_DELETE_BATCH):
+            chunk = keys[start:start + MAX_DELETE_BATCH]
+            response = self.client.delete_objects(Bucket=bucket_name,
+                                                  Delete={'Objects': [{'Key': key} for key in chunk],
+                                                          'Quiet': True})
+            errors.extend(response.get('Errors', []))
+        return errors
+
+    def deletedir(self, bucket_name, recursive=''):
+        if recursive not in ('', '-r'):
+            return self._error_messages('unknown_option')
 
-        # Delete the bucket only if it is empty
+        # Delete the bucket only if it is empty, unless asked to empty it first
         try:
+            if recursive:
+                paginator = self.client.get_paginator('list_objects_v2')
+                for page in paginator.paginate(Bucket=bucket_name):
+                    keys = [obj['Key'] for obj in page.get('Contents', [])]
+                    errors = self._delete_many(bucket_name, keys)
+                    if errors:
+                        failed = ', '.join(f"{error['Key']} ({error['Code']})" for error in errors)
+                        return f'Failed to delete objects from bucket {bucket_name}: {failed}'
             self.client.delete_bucket(
                 Bucket=bucket_name
             )
         except ClientError as e:
-            if e.response['Error']['Code'] == 'BucketNotEmpty':
+            code = self._error_code(e)
+            if code == 'NoSuchBucket':
+                self._set_bucket_exists(bucket_name, False)
+                return self._error_messages('non_existent_bucket')
+            elif code == 'BucketNotEmpty':
                 return self._error_messages('bucket_not_empty')
             else:
-                return ('Failed to delete bucket %s: %s' % (bucket_name, e) )
+                return f'Failed to delete bucket {bucket_name}: {e}'
             return e
-        
+        self._set_bucket_exists(bucket_name, False)
+
         # Success response
-        operation_successful = ("Deleted bucket %s." % bucket_name)
+        operation_successful = f"Deleted bucket {bucket_name}."
         
         return operation_successful
 
 
+    def _find_in_bucket(self, bucket_name, file_extension):
+        # Runs on a worker thread; only the matching keys are handed back.
+        # Returns None if the bucket no longer exists (e.g. deleted after list_buckets).
+        # Accept both 'txt' and '.txt'
+        suffix = '.' + file_extension.lstrip('.')
+        matches = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        try:
+            for page in paginator.paginate(Bucket=bucket_name):
+                for obj in page.get('Contents', []):
+                    if obj['Key'].endswith(suffix):
+                        matches.append(obj['Key'])
+        except ClientError as e:
+            if self._error_code(e) == 'NoSuchBucket':
+                self._set_bucket_exists(bucket_name, False)
+                return None
+            raise
+        return matches
+
     def find(self, file_extension, bucket_name=''):
         # Return object names that match the given file extension
         if bucket_name != '':
-            if not self._get(bucket_name):          #check for directory
+            if not self._bucket_exists(bucket_name):    #check for directory
                 return self._error_messages('non_existent_bucket')
 
         # If bucket_name is specified then search for objects in that bucket.
         result = []
         if bucket_name:
-            object_list = self.client.list_objects_v2(
-                Bucket=bucket_name
-            )
-            
-            objects = object_list['Contents']
-
-            print('Found the following objects in bucket %s: ' % bucket_name)
-            for obj in objects:
-                object_name = obj['Key']
-                obj_meta = self.client.head_object(
-                    Bucket=bucket_name,
-                    Key=object_name
-                )
-
-                meta = obj_meta['ContentType']
-                if meta.endswith(file_extension):
-                    result.append(object_name)
-
-        # If bucket_name is empty then search all buckets
+            result = self._find_in_bucket(bucket_name, file_extension)
+            if result is None:
+                # The cached answer can be stale if the bucket was deleted elsewhere
+                return self._error_messages('non_existent_bucket')
+            print(f'Found the following objects in bucket {bucket_name}: ')
+
+        # If bucket_name is empty then search all buckets, listing them in parallel
         else:
             bucket_list = self.client.list_buckets()
 
             buckets = bucket_list['Buckets']
             print('Found the following objects in all buckets:')
 
-            for bucket in buckets:
-                bucket_name = bucket['Name']
-                object_list = self.client.list_objects_v2(
-                    Bucket=bucket_name
-                )
-                
-                objects = object_list['Contents']
-                for obj in objects:
-                    object_name = obj['Key']
-                    obj_meta = self.client.head_object(
-                        Bucket=bucket_name,
-                        Key=object_name
-                    )
-
-                    meta = obj_meta['ContentType']
-                    if meta.endswith(file_extension):
-                        result.append(object_name)
-                    
+            futures = [self._pool.submit(self._find_in_bucket, bucket['Name'], file_extension)
+                       for bucket in buckets]
+            # Collect in submission order so the output is stable between runs;
+            # buckets deleted mid-search are skipped
+            for future in futures:
+                result.extend(future.result() or [])
+
         if len(result) == 0:
             return ("No results found")
 
         return ', '.join(result)
 
 
-    def dispatch(self, command_string):
-        parts = command_string.split(" ")
-        response = ''
+    def dispatch(self, parts):
+        # parts is the command already split by main(), e.g. ['upload', 'a.txt', 'bucket1'];
+        # a plain command string is still accepted and split here
+        if isinstance(parts, str):
+            parts = shlex.split(parts)
+        if not parts or parts[0] not in self._commands:
+            return "Command not recognized."
 
-        if parts[0] == 'createdir':
-            # Figure out bucket_name from command_string
-            if len(parts) > 1:
-                bucket_name = parts[1]
-                response = self.createdir(bucket_name)
-            else:
-                # Parameter Validation
-                # - Bucket name is not empty
-                response = self._error_messages('bucket_name_empty')
-        elif parts[0] == 'upload':
-            # Figure out parameters from command_string
-            # source_file_name and bucket_name are compulsory; dest_object_name is optional
-            # Use self._error_messages['incorrect_parameter_number'] if number of parameters is less
-            # than number of compulsory parameters
-            if len(parts) < 3:
-                return self._error_messages('incorrect_parameter_number')
-            source_file_name = parts[1]
-            bucket_name = parts[2]
-            dest_object_name = ''
-            if len(parts) > 3:
-                dest_object_name = parts[3]
-            response = self.upload(source_file_name, bucket_name, dest_object_name)
-        elif parts[0] == 'download':
-            # Figure out parameters from command_string
-            # dest_object_name and bucket_name are compulsory; source_file_name is optional
-            # Use self._error_messages['incorrect_parameter_number'] if number of parameters is less
-            # than number of compulsory parameters
-            if len(parts) < 3:
-                return self._error_messages('incorrect_parameter_number')
-            dest_object_name = parts[1]
-            bucket_name = parts[2]
-            source_file_name = ''
-            if len(parts) > 3:
-                source_file_name = parts[3]
-            response = self.download(dest_object_name, bucket_name, source_file_name)
-        elif parts[0] == 'delete':
-            if len(parts) < 3:
-                return self._error_messages('incorrect_parameter_number')
-            dest_object_name = parts[1]
-            bucket_name = parts[2]
-            response = self.delete(dest_object_name, bucket_name)
-        elif parts[0] == 'deletedir':
-            if len(parts) < 2:
-                return self._error_messages('incorrect_parameter_number')
-            bucket_name = parts[1]
-            response = self.deletedir(bucket_name)
-        elif parts[0] == 'find':
-            if len(parts) < 2:
-                return self._error_messages('incorrect_parameter_number')
-            file_extension = parts[1]
-            bucket_name = ''
-            if len(parts) > 2:
-                bucket_name = parts[2]
-            response = self.find(file_extension, bucket_name)
-        elif parts[0] == 'listdir':
-            bucket_name = ''
-            if len(parts) > 1:
-                bucket_name = parts[1]
-            response = self.listdir(bucket_name)
-        else:
-            response = "Command not recognized."
-        return response
+        handler, min_args, max_args = self._commands[parts[0]]
+        args = parts[1:]
+        if not min_args <= len(args) <= max_args:
+            if parts[0] == 'createdir' and not args:
+                return self._error_messages('bucket_name_empty')
+            return self._error_messages('incorrect_parameter_number')
+        return handler(*args)
 
 
 def main():
@@ -380,22 +486,17 @@ def main():
     
     while True:
         try:
-            command_string = ''
-            if sys.version_info[0] < 3:
-                command_string = raw_input("Enter command ('help' to see all commands, 'exit' to quit)>")
-            else:
-                command_string = input("Enter command ('help' to see all commands, 'exit' to quit)>")
-    
-            # Remove multiple whitespaces, if they exist
-            command_string = " ".join(command_string.split())
-            
-            if command_string == 'exit':
+            command_string = input("Enter command ('help' to see all commands, 'exit' to quit)>")
+
+            # Tokenize once; shlex keeps quoted names with spaces together and ignores extra whitespace
+            parts = shlex.split(command_string)
+            if parts == ['exit']:
                 print("Goodbye!")
                 exit()
-            elif command_string == 'help':
+            elif parts == ['help']:
                 s3_handler.help()
             else:
-                response = s3_handler.dispatch(command_string)
+                response = s3_handler.dispatch(parts)
                 print(response)
         except Exception as e:
             print(e)